@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import warnings
 # Suppress deprecation warnings from google.generativeai
@@ -8,7 +9,7 @@ warnings.simplefilter(action='ignore', category=FutureWarning)
 from dotenv import load_dotenv
 from pypdf import PdfReader
 from matcher import ResumeMatcher
-from scraper import scrape_job_boards, scrape_social_posts
+from scraper import scrape_job_boards, scrape_social_posts, remove_duplicate_jobs, cached_scrape
 
 # Load environment variables
 load_dotenv()
@@ -23,13 +24,26 @@ if 'suggested_roles' not in st.session_state:
 if 'job_results' not in st.session_state:
     st.session_state.job_results = pd.DataFrame()
 
+@st.cache_resource
+def get_matcher():
+    """
+    Shared ResumeMatcher across reruns and sessions, so the encoder is loaded once.
+    """
+    matcher = ResumeMatcher()
+    if matcher.model:
+        # Warm-up encode so the first search doesn't pay one-time init costs
+        matcher.model.encode("warm-up", show_progress_bar=False)
+    return matcher
+
 def extract_text_from_pdf(uploaded_file):
     try:
         reader = PdfReader(uploaded_file)
-        text = ""
+        parts = []
         for page in reader.pages:
-            text += page.extract_text()
-        return text
+            page_text = page.extract_text()
+            if page_text: # None/empty for image-only pages
+                parts.append(page_text)
+        return "\n".join(parts)
     except Exception as e:
         st.error(f"Error parsing PDF: {e}")
         return ""
@@ -67,10 +81,14 @@ def main():
         
         enable_strict_filter = st.toggle("Strict Experience Filter", value=True, help="Filters out jobs requiring > (Your Years + 1)")
         enable_deep_analysis = st.toggle("Enable Deep AI Analysis (Layer 2)", value=False)
-        st.caption("Layer 2 uses Gemini Flash (Slow due to rate limits)")
+        st.caption("Layer 2 uses Gemini Flash (paced at 15 requests/min, ~4s per job)")
 
     # --- Main Content ---
     
+    # Load (and warm up) the encoder up front; cached after the first run
+    with st.spinner("Loading embedding model..."):
+        get_matcher()
+    
     # 1. Resume Upload
     st.subheader("1. Upload Resume")
     uploaded_file = st.file_uploader("Upload your resume (PDF)", type="pdf")
@@ -97,9 +115,11 @@ def main():
         status_text = st.empty()
         status_text.text("Scraping job boards...")
         
-        roles = [r.strip() for r in job_roles_input.split(',') if r.strip()]
+        # dict.fromkeys drops repeated roles while keeping input order
+        roles = list(dict.fromkeys(r.strip() for r in job_roles_input.split(',') if r.strip()))
         
         all_dfs = []
+        role_codes = [] # index into roles for each frame in all_dfs
         progress_bar = st.progress(0)
         
         # Scrape loop
@@ -107,15 +127,13 @@ def main():
             for i, role in enumerate(roles):
                 status_text.text(f"Scraping for '{role}'...")
                 
-                df_boards = scrape_job_boards(role, location, num_jobs, hours_old, linkedin_fetch_description=fetch_full_desc)
-                df_social = scrape_social_posts(role, location)
+                df_boards = cached_scrape(scrape_job_boards, role, location, num_jobs, hours_old, linkedin_fetch_description=fetch_full_desc)
+                df_social = cached_scrape(scrape_social_posts, role, location)
                 
-                if not df_boards.empty:
-                    df_boards['Search_Term'] = role
-                    all_dfs.append(df_boards)
-                if not df_social.empty:
-                    df_social['Search_Term'] = role
-                    all_dfs.append(df_social)
+                for df_part in (df_boards, df_social):
+                    if not df_part.empty:
+                        all_dfs.append(df_part)
+                        role_codes.append(i)
                 
                 progress_bar.progress((i + 1) / len(roles))
 
@@ -126,12 +144,16 @@ def main():
                 return
 
             df = pd.concat(all_dfs, ignore_index=True)
+            # Categorical stores each role string once instead of once per row
+            df['Search_Term'] = pd.Categorical.from_codes(
+                np.repeat(role_codes, [len(d) for d in all_dfs]), categories=roles
+            )
             status_text.text("Processing results...")
             
             # Remove Duplicates
             if remove_duplicates:
                 before_dedup = len(df)
-                df = df.drop_duplicates(subset=['title', 'company', 'location'], keep='first')
+                df = remove_duplicate_jobs(df)
                 after_dedup = len(df)
                 if before_dedup > after_dedup:
                     st.toast(f"Removed {before_dedup - after_dedup} duplicate jobs.")
@@ -139,11 +161,15 @@ def main():
             st.write(f"Found {len(df)} unique jobs. Running Layer 1 (Vector Match)...")
             
             # Layer 1: Local Vector Match + Guardrails
-            matcher = ResumeMatcher()
+            matcher = get_matcher()
             df['description'] = df['description'].fillna('')
             
+            # Cross-posted jobs often share the exact same description,
+            # so the regex/encode work below runs once per unique description and is mapped back.
+            desc_codes, unique_descs = pd.factorize(df['description'])
+            
             # Extract experience for ALL jobs first (for visibility and filtering)
-            df['Min_Years_Req'] = df['description'].apply(lambda x: matcher.extract_job_experience_requirement(x))
+            df['Min_Years_Req'] = matcher.extract_many(unique_descs)[desc_codes]
             
             # 1.1 Experience Filter (Guardrail)
             if enable_strict_filter:
@@ -158,9 +184,8 @@ def main():
                     st.caption(f"Filtered out {initial_count - filtered_count} jobs due to experience mismatch.")
 
             # 1.2 Vector Score
-            df['Vector_Score'] = df['description'].apply(
-                lambda x: matcher.get_embedding_score(st.session_state.resume_text, x)
-            )
+            desc_codes, unique_descs = pd.factorize(df['description'])
+            df['Vector_Score'] = matcher.score_batch(st.session_state.resume_text, unique_descs.tolist())[desc_codes]
             
             # Sort by Vector Score
             df = df.sort_values(by='Vector_Score', ascending=False)
@@ -171,22 +196,26 @@ def main():
                 progress_bar = st.progress(0)
                 
                 # Initialize new columns
-                df['AI_Match_Score'] = 0
+                df['AI_Match_Score'] = np.zeros(len(df), dtype=np.int16)
                 df['Missing_Skills'] = ""
                 df['Reasoning'] = ""
                 
                 # Analyze only top 20
                 subset = df.head(20)
-                total_to_analyze = len(subset)
                 
-                for i, (index, row) in enumerate(subset.iterrows()):
-                    res = matcher.get_gemini_analysis(st.session_state.resume_text, row['description'], api_key)
-                    
-                    df.at[index, 'AI_Match_Score'] = res.get('match_percentage', 0)
-                    df.at[index, 'Missing_Skills'] = ", ".join(res.get('missing_skills', []))
-                    df.at[index, 'Reasoning'] = res.get('reasoning', '')
-                    
-                    progress_bar.progress((i + 1) / total_to_analyze)
+                results = matcher.analyze_many(
+                    st.session_state.resume_text,
+                    subset['description'].tolist(),
+                    api_key,
+                    on_progress=lambda done, total: progress_bar.progress(done / total),
+                )
+                
+                # Assign each column in one shot instead of per-row df.at writes
+                indices = subset.index.to_numpy()
+                ai_scores = pd.to_numeric(pd.Series([r.get('match_percentage', 0) for r in results]), errors='coerce')
+                df.loc[indices, 'AI_Match_Score'] = ai_scores.fillna(0).to_numpy(dtype=np.int16)
+                df.loc[indices, 'Missing_Skills'] = [", ".join(r.get('missing_skills', [])) for r in results]
+                df.loc[indices, 'Reasoning'] = [r.get('reasoning', '') for r in results]
                 
                 # Sort by AI Score first, then Vector Score
                 df = df.sort_values(by=['AI_Match_Score', 'Vector_Score'], ascending=False)
@@ -206,14 +235,6 @@ def main():
             display_cols.insert(0, 'AI_Match_Score')
             display_cols.append('Missing_Skills')
         
-        if 'Min_Years_Req' not in st.session_state.job_results.columns:
-             # Backward compatibility / Safety: Recalculate if missing
-             if 'description' in st.session_state.job_results.columns:
-                 matcher = ResumeMatcher()
-                 st.session_state.job_results['Min_Years_Req'] = st.session_state.job_results['description'].apply(lambda x: matcher.extract_job_experience_requirement(x) if x else 0)
-             else:
-                 st.session_state.job_results['Min_Years_Req'] = 0
-
         st.dataframe(
             st.session_state.job_results[display_cols],
             column_config={
@@ -1,9 +1,24 @@
 import pandas as pd
+import re
+import time
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from jobspy import scrape_jobs
 from duckduckgo_search import DDGS
 
 import requests
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
+
+# Max concurrent fallback description fetches
+FALLBACK_FETCH_WORKERS = 16
+
+# Raw scrape results are reused from disk for this long (seconds)
+SCRAPE_CACHE_DIR = Path('./.scrape_cache')
+SCRAPE_CACHE_TTL = 1800
+
+# Legal suffixes ignored when comparing company names ("Google Inc." == "Google")
+_COMPANY_SUFFIX_RE = re.compile(r'[\s,]+(?:inc|llc|ltd|limited|corp|corporation|co|plc|gmbh)\.?$')
 
 def fetch_description_from_url(url):
     """
@@ -15,14 +30,18 @@ def fetch_description_from_url(url):
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
         response = requests.get(url, headers=headers, timeout=10)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
+            tree = HTMLParser(response.content)
             # Extract text (simple fallback)
             # We try to target common job board containers if possible, else body
             for tag in ['script', 'style', 'nav', 'header', 'footer']:
-                 for s in soup(tag):
-                     s.decompose()
+                 for node in tree.css(tag):
+                     node.decompose()
             
-            return soup.get_text(separator='\n', strip=True)
+            root = tree.body or tree.root
+            if root is None:
+                return ""
+            # truncate to avoid huge memory usage
+            return root.text(separator='\n', strip=True)[:5000]
     except Exception as e:
         print(f"Fallback fetch failed for {url}: {e}")
     return ""
@@ -49,18 +68,23 @@ def scrape_job_boards(role, location, num_jobs=10, hours_old=72, linkedin_fetch_
                 jobs['description'] = ""
             
             # Fill missing/empty descriptions
-            # We iterate to avoid making 500 requests at once if not needed.
-            # Only fetch if description is missing or very short (< 50 chars)
-            for index, row in jobs.iterrows():
-                desc = str(row.get('description', ''))
-                if not desc or len(desc) < 50:
-                    url = row.get('job_url')
-                    if url:
-                        print(f"Fetching fallback description for: {row.get('title')}...")
-                        fallback_text = fetch_description_from_url(url)
-                        if fallback_text:
-                            jobs.at[index, 'description'] = fallback_text[:5000] # truncate to avoid huge memory usage
-                            
+            # Only fetch if description is missing or very short (< 50 chars).
+            # Fallback fetches are independent network waits, so run them on a thread pool.
+            desc = jobs['description'].fillna("").astype(str)
+            urls = jobs['job_url'] if 'job_url' in jobs.columns else pd.Series(None, index=jobs.index)
+            needs_fallback = (desc.str.len() < 50) & urls.notna() & (urls != "")
+            if needs_fallback.any():
+                indices = jobs.index[needs_fallback]
+                urls = urls[needs_fallback].tolist()
+                print(f"Fetching fallback descriptions for {len(urls)} jobs...")
+                with ThreadPoolExecutor(max_workers=FALLBACK_FETCH_WORKERS) as pool:
+                    fallback_texts = list(pool.map(fetch_description_from_url, urls))
+
+                fetched = [(i, text) for i, text in zip(indices, fallback_texts) if text]
+                if fetched:
+                    fetched_indices, fetched_texts = zip(*fetched)
+                    jobs.loc[list(fetched_indices), 'description'] = list(fetched_texts)
+
             jobs['description'] = jobs['description'].fillna("")
             return jobs
         return pd.DataFrame()
@@ -95,3 +119,48 @@ def scrape_social_posts(role, location):
     except Exception as e:
         print(f"Error scraping social posts: {e}")
         return pd.DataFrame()
+
+
+def _normalize_key_column(series):
+    return (series.fillna("").astype(str).str.lower()
+            .str.replace(r'\s+', ' ', regex=True)
+            .str.strip())
+
+def remove_duplicate_jobs(df):
+    """
+    Drops jobs with the same Title, Company, and Location, keeping the first.
+    Keys are compared case- and whitespace-insensitively, ignoring company legal suffixes.
+    """
+    if df.empty:
+        return df
+    cols = {}
+    for col in ['title', 'company', 'location']:
+        cols[col] = _normalize_key_column(df[col]) if col in df.columns else pd.Series("", index=df.index)
+    company = cols['company'].str.replace(_COMPANY_SUFFIX_RE, '', regex=True).str.strip()
+
+    key = cols['title'] + '|' + company + '|' + cols['location']
+    mask = ~pd.Index(key).duplicated(keep='first')
+    return df[mask]
+
+def cached_scrape(scrape_fn, *args, **kwargs):
+    """
+    Calls scrape_fn(*args, **kwargs), reusing its result from a Parquet file
+    if the same call was made within SCRAPE_CACHE_TTL seconds.
+    Empty results are not cached so failed scrapes are retried.
+    """
+    key = hashlib.sha1(f"{scrape_fn.__name__}|{args}|{sorted(kwargs.items())}".encode()).hexdigest()
+    path = SCRAPE_CACHE_DIR / f"{key}.parquet"
+    if path.exists() and time.time() - path.stat().st_mtime < SCRAPE_CACHE_TTL:
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            print(f"Error reading scrape cache {path}: {e}")
+
+    df = scrape_fn(*args, **kwargs)
+    if not df.empty:
+        try:
+            SCRAPE_CACHE_DIR.mkdir(exist_ok=True)
+            df.to_parquet(path)
+        except Exception as e:
+            print(f"Error writing scrape cache {path}: {e}")
+    return df